@@ -1,52 +1,76 @@
-import asyncio, json, math, os, threading, time
+import asyncio, bisect, functools, json, math, multiprocessing, os, queue, signal, struct, threading, time
 import uuid
+from array import array
 from collections import deque
-from dataclasses import dataclass, asdict
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, Set
 from contextlib import asynccontextmanager
 
+import orjson
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from sse_starlette.sse import EventSourceResponse
 import paho.mqtt.client as mqtt
 
 CONFIG_PATH = os.environ.get("PSKPROP_CONFIG", os.path.join(os.path.dirname(__file__), "config.json"))
+STATE_PATH = os.environ.get("PSKPROP_STATE", os.path.join(os.environ.get("PSKPROP_CONFIG_DIR") or os.path.dirname(CONFIG_PATH), "dots.bin"))
+CHECKPOINT_S = 300
 
-def maidenhead_to_latlon(grid: str) -> Optional[Tuple[float, float]]:
+LON_STEP_6 = 5/60; LAT_STEP_6 = 2.5/60
+LON_STEP_8 = 0.5/60; LAT_STEP_8 = 0.25/60
+# (lon, lat) cell size by locator length, used to return the cell centre
+GRID_CELL = {2: (20, 10), 4: (2, 1), 6: (LON_STEP_6, LAT_STEP_6), 8: (LON_STEP_8, LAT_STEP_8)}
+
+def _parse_grid_uncached(grid: str) -> Optional[Tuple[float, float]]:
     if not grid or len(grid) < 2:
         return None
-    g = grid.strip().upper()
-    if len(g) % 2 != 0:
-        g += "MM"
-    try:
-        lon = (ord(g[0]) - ord('A')) * 20 - 180
-        lat = (ord(g[1]) - ord('A')) * 10 - 90
-        if len(g) >= 4:
-            lon += int(g[2]) * 2
-            lat += int(g[3]) * 1
-        if len(g) >= 6:
-            lon += (ord(g[4]) - ord('A')) * (5/60)
-            lat += (ord(g[5]) - ord('A')) * (2.5/60)
-        if len(g) >= 8:
-            lon += int(g[6]) * (0.5/60)
-            lat += int(g[7]) * (0.25/60)
-        size_lon, size_lat = 20, 10
-        if len(g) >= 4: size_lon, size_lat = 2, 1
-        if len(g) >= 6: size_lon, size_lat = 5/60, 2.5/60
-        if len(g) >= 8: size_lon, size_lat = 0.5/60, 0.25/60
-        lon += size_lon/2; lat += size_lat/2
-        return (lat, lon)
-    except Exception:
+    g = grid.strip().upper().encode("ascii", "replace")
+    n = len(g)
+    if n < 2:
         return None
-
-def haversine_km(lat1, lon1, lat2, lon2):
+    if n % 2 != 0:
+        g += b"MM"; n += 2
+    n = min(n, 8) & ~1
+    # field A-R, square 0-9, subsquare A-X, extended 0-9
+    c0 = g[0] - 65; c1 = g[1] - 65
+    if not (0 <= c0 < 18 and 0 <= c1 < 18): return None
+    lon = c0*20 - 180; lat = c1*10 - 90
+    if n >= 4:
+        c2 = g[2] - 48; c3 = g[3] - 48
+        if not (0 <= c2 < 10 and 0 <= c3 < 10): return None
+        lon += c2*2; lat += c3
+    if n >= 6:
+        c4 = g[4] - 65; c5 = g[5] - 65
+        if not (0 <= c4 < 24 and 0 <= c5 < 24): return None
+        lon += c4*LON_STEP_6; lat += c5*LAT_STEP_6
+    if n >= 8:
+        c6 = g[6] - 48; c7 = g[7] - 48
+        if not (0 <= c6 < 10 and 0 <= c7 < 10): return None
+        lon += c6*LON_STEP_8; lat += c7*LAT_STEP_8
+    size_lon, size_lat = GRID_CELL[n]
+    return (lat + size_lat*0.5, lon + size_lon*0.5)
+
+# locators repeat heavily across spots; callers pass strip().upper() so variants share an entry
+maidenhead_to_latlon = functools.lru_cache(maxsize=65536)(_parse_grid_uncached)
+
+def haversine_km(lat2, lon2):
+    # distance from home; HOME_LAT_R/COS_HOME_LAT_R are refreshed whenever home changes
     R = 6371.0088
-    from math import radians, sin, cos, atan2, sqrt
-    dphi = radians(lat2-lat1); dl = radians(lon2-lon1)
-    a = sin(dphi/2)**2 + cos(radians(lat1))*cos(radians(lat2))*sin(dl/2)**2
+    from math import radians, sin, cos
+    dphi = radians(lat2) - HOME_LAT_R; dl = radians(lon2-HOME_LON)
+    a = sin(dphi/2)**2 + COS_HOME_LAT_R*cos(radians(lat2))*sin(dl/2)**2
     return 2*R*math.atan2(math.sqrt(a), math.sqrt(1-a))
 
+KM_PER_DEG = 111.32
+APPROX_MAX_KM = 500  # equirectangular error stays well under 1% below this radius
+
+def dist2_km(lat, lon):
+    # squared equirectangular distance (km^2) from home; only valid for small radii
+    dlon = (lon - HOME_LON + 180) % 360 - 180
+    dx = dlon * math.cos(math.radians((lat + HOME_LAT) * 0.5)) * KM_PER_DEG
+    dy = (lat - HOME_LAT) * KM_PER_DEG
+    return dx*dx + dy*dy
+
 BANDS = [
     ("160m", 1_800_000, 2_000_000),
     ("80m", 3_500_000, 4_000_000),
@@ -60,12 +84,18 @@ BANDS = [
     ("10m", 28_000_000, 29_700_000),
     ("6m", 50_000_000, 54_000_000),
 ]
+BAND_NAMES = frozenset(b[0] for b in BANDS)
+# parallel columns of BANDS (sorted by lower edge) for bisect lookup
+_BAND_NM = [b[0] for b in BANDS]
+_BAND_LOS = [b[1] for b in BANDS]
+_BAND_HIS = [b[2] for b in BANDS]
+
 def band_of_frequency(freq_hz: Optional[int]) -> Optional[str]:
     if freq_hz is None: return None
     try: f = int(freq_hz)
     except Exception: return None
-    for name, lo, hi in BANDS:
-        if lo <= f <= hi: return name
+    i = bisect.bisect_right(_BAND_LOS, f) - 1
+    if i >= 0 and f <= _BAND_HIS[i]: return _BAND_NM[i]
     return None
 
 BAND_COLORS = {
@@ -81,35 +111,120 @@ def load_config() -> dict:
 CONFIG = load_config()
 home_latlon = maidenhead_to_latlon(CONFIG.get("home_locator","")) or (60.1708, 24.9375)
 HOME_LAT, HOME_LON = home_latlon
+HOME_LAT_R = math.radians(HOME_LAT)
+COS_HOME_LAT_R = math.cos(HOME_LAT_R)
 RADIUS_KM = float(CONFIG.get("radius_km", 400))
+RADIUS_KM2 = RADIUS_KM**2
 AGE_MIN = int(CONFIG.get("age_minutes", 15))
-ENABLED_BANDS = set(CONFIG.get("bands", [b[0] for b in BANDS]))
+ENABLED_BANDS = frozenset(CONFIG.get("bands", _BAND_NM))
 MAP_TYPE = CONFIG.get("map_type", "aeqd")
 TOPICS = CONFIG.get("mqtt", {}).get("topics") or [f"pskr/filter/v2/{b}/#" for b in ENABLED_BANDS]
 
-@dataclass
-class Dot:
-    lat: float; lon: float; band: str; snr: Optional[int]; ts: float; kind: str
+KINDS = ("sender", "receiver")
+BAND_IDS = {name: i for i, name in enumerate(_BAND_NM)}
+SNR_NONE = -32768  # int16 sentinel for a spot without an SNR report
+# packed 20-byte dot record (lat, lon, band_id, snr, ts, kind) sent from the MQTT worker process
+REC = struct.Struct("<ffBhdB")
+
+RING_COLS = ("lat", "lon", "band", "snr", "ts", "kind")
+RING_TYPES = ("f", "f", "B", "h", "d", "B")  # float32 lat/lon, uint8 ids, int16 snr, float64 ts
+
+class Ring:
+    # fixed-size column store of dots, oldest first starting at head
+    def __init__(self, size: int):
+        self.size = size; self.head = 0; self.count = 0; self.version = 0
+        self.lock = threading.Lock()
+        for name, tc in zip(RING_COLS, RING_TYPES):
+            setattr(self, name, array(tc, [0]) * size)
+    def __len__(self): return self.count
+    def _ordered(self, col):
+        end = self.head + self.count
+        if end <= self.size: return col[self.head:end]
+        return col[self.head:] + col[:end - self.size]
+    def extend(self, lat, lon, band_id, snr, ts, kind):
+        cols = (lat, lon, band_id, snr, ts, kind)
+        n = len(ts)
+        if n > self.size:
+            cols = tuple(c[-self.size:] for c in cols); n = self.size
+        with self.lock:
+            start = (self.head + self.count) % self.size
+            first = min(n, self.size - start)
+            for name, vals in zip(RING_COLS, cols):
+                col = getattr(self, name); vals = array(col.typecode, vals)
+                col[start:start + first] = vals[:first]
+                if first < n: col[:n - first] = vals[first:]
+            over = max(0, self.count + n - self.size)
+            self.head = (self.head + over) % self.size; self.count += n - over; self.version += 1
+    def prune(self, cutoff: float) -> int:
+        # ts is the spot's own report time, which is not sorted (reports arrive with varying delay);
+        # like the old deque popleft loop, expire only the leading run of dots older than cutoff
+        with self.lock:
+            ts = self.ts; n = 0; i = self.head
+            while n < self.count and ts[i] < cutoff:
+                n += 1; i = (i + 1) % self.size
+            self.head = i; self.count -= n
+            if n: self.version += 1
+        return n
+    def clear(self):
+        with self.lock: self.head = 0; self.count = 0; self.version += 1
+    def arrays(self) -> tuple:
+        with self.lock:
+            return tuple(self._ordered(getattr(self, k)) for k in RING_COLS)
+    def columns(self) -> dict:
+        with self.lock:
+            cols = {k: self._ordered(getattr(self, k)).tolist() for k in RING_COLS}
+        cols["band"] = [_BAND_NM[b] for b in cols["band"]]
+        cols["snr"] = [None if v == SNR_NONE else v for v in cols["snr"]]
+        cols["kind"] = [KINDS[k] for k in cols["kind"]]
+        return cols
+
+DOTS = Ring(20000)
+# serialized snapshot frame shared by all new SSE connections until DOTS changes
+SNAPSHOT_DATA = ""
+SNAPSHOT_VERSION = -1
+
+def snapshot_frame() -> str:
+    global SNAPSHOT_DATA, SNAPSHOT_VERSION
+    version = DOTS.version
+    if version != SNAPSHOT_VERSION:
+        SNAPSHOT_DATA = orjson.dumps({"type": "snapshot", "payload": DOTS.columns()}).decode()
+        SNAPSHOT_VERSION = version
+    return SNAPSHOT_DATA
 
-DOTS: deque = deque(maxlen=20000)
 APP_LOOP = None
 MQTT_CLIENT = None
+# bumped on every POST /config; records the worker filtered under an older config are dropped
+CONFIG_GEN = 0
+WORKER_PROC = None
+WORKER_Q = None
+WORKER_CTL = None
+WORKER_QUEUE_MAX = 256  # worker drops batches rather than grow the queue when the web side stalls
+WORKER_RESTARTS = 0
+STATS_EVERY_S = 1.0
+GRID_CACHE: dict = {}
+# bumped whenever worker stats actually change; part of the /stats and /recent ETags
+STATS_VERSION = 0
+LAST_STATS: dict = {}
 CURRENT_TOPICS = set()
 PROCESSED = 0
 SEEN = 0
-DROP_COUNTS = {"grid_invalid":0,"missing_loc":0,"band_filtered":0,"radius":0,"parse":0}
+DROP_COUNTS = {"grid_invalid":0,"missing_loc":0,"band_filtered":0,"radius":0,"parse":0,"queue_full":0}
+# RECENT holds compact (reason, band_id, snr, decision, extra) tuples; /recent expands them
 RECENT: deque = deque(maxlen=50)
+REASONS = ("ok", "missing_loc", "grid_invalid", "radius", "band_filtered", "exception")
+R_OK, R_MISSING_LOC, R_GRID_INVALID, R_RADIUS, R_BAND_FILTERED, R_EXCEPTION = range(len(REASONS))
+DECISIONS = (None, "receiver_in_radius -> plot_sender", "sender_in_radius -> plot_receiver")
+D_PLOT_SENDER, D_PLOT_RECEIVER = 1, 2
+
+# spots that passed band/grid checks, waiting for the batched radius filter
+INGEST: list = []
+INGEST_LOCK = threading.Lock()
+INGEST_WAKE = threading.Event()
+INGEST_FLUSH_S = 0.02
+INGEST_MAX = 256
 
-def _extract_fields(data: dict):
-    sender_grid = data.get("senderLocator") or data.get("senderGrid") or data.get("sl")
-    receiver_grid = data.get("receiverLocator") or data.get("receiverGrid") or data.get("rl")
-    sender = data.get("senderCallsign") or data.get("sc")
-    receiver = data.get("receiverCallsign") or data.get("rc")
-    freq = data.get("frequency") or data.get("frequencyHz") or data.get("f")
-    band = data.get("band") or data.get("b")
-    snr = data.get("sNR");  snr = data.get("snr") if snr is None else snr;  snr = data.get("rp") if snr is None else snr
-    ts = data.get("flowStartSeconds") or data.get("t")
-    return sender_grid, receiver_grid, sender, receiver, freq, band, snr, ts
+# web process drains the worker queue and sends one add_batch frame per flush
+FLUSH_S = 0.05
 
 def normalize_band_str(b: str) -> str:
     if not b: return ""
@@ -121,20 +236,31 @@ def normalize_band_str(b: str) -> str:
         except Exception: return ""
     return s
 
+# only a handful of distinct band strings ever appear, so the normalize chain runs once per value
+@functools.lru_cache(maxsize=1024, typed=True)
+def _band_from_str(b) -> Optional[str]:
+    bs = normalize_band_str(b)
+    return bs if bs in BAND_NAMES else None
+
 def band_label_from(freq, b):
     name = band_of_frequency(freq) if freq is not None else None
     if name: return name
-    bs = normalize_band_str(b)
-    if bs in {x[0] for x in BANDS}: return bs
-    return None
+    try: return _band_from_str(b)
+    except TypeError: return None  # unhashable JSON value (list/dict)
 
 def parse_snr(v):
-    if v is None: return None
-    try:
-        if isinstance(v, (int,float)): return int(round(float(v)))
-        return int(round(float(str(v).strip().replace("\u2212","-"))))
-    except Exception:
-        return None
+    # PSK Reporter nearly always sends an int; only strings need real parsing
+    t = type(v)
+    if t is int: return v
+    if t is float:
+        try: return round(v)
+        except (ValueError, OverflowError): return None
+    if t is str:
+        s = v.strip()
+        if s[:1] == "\u2212": s = "-" + s[1:]
+        try: return round(float(s))
+        except (ValueError, OverflowError): return None
+    return None
 
 def on_connect(client, userdata, flags, rc, properties=None):
     print(f"MQTT connected rc={rc}")
@@ -142,68 +268,220 @@ def on_connect(client, userdata, flags, rc, properties=None):
         client.subscribe(t, qos=0)
         print(f"  subscribed: {t}")
 
-def on_message(client, userdata, msg):
-    global SEEN, PROCESSED
+# hot path: module globals are bound as keyword defaults (LOAD_FAST instead of LOAD_GLOBAL);
+# _bind_on_message() refreshes the ones that POST /config can replace
+def on_message(client, userdata, msg, *, _loads=orjson.loads, _band_label=band_label_from, _grid=maidenhead_to_latlon,
+               _time=time.time, _drops=DROP_COUNTS, _recent=RECENT, _band_ids=BAND_IDS, _ingest=INGEST,
+               _lock=INGEST_LOCK, _wake=INGEST_WAKE, _max=INGEST_MAX, _bands=ENABLED_BANDS):
+    global SEEN
     try:
-        data = json.loads(msg.payload.decode("utf-8"))
+        data = _loads(msg.payload)
     except Exception:
         return
     SEEN += 1
     try:
-        sender_grid, receiver_grid, sender, receiver, freq, band, snr, ts = _extract_fields(data)
-        band = band_label_from(freq, band)
-        if not band or band not in ENABLED_BANDS:
-            DROP_COUNTS["band_filtered"] += 1; return
+        get = data.get
+        freq = get("frequency") or get("frequencyHz") or get("f")
+        band = _band_label(freq, get("band") or get("b"))
+        if not band or band not in _bands:
+            _drops["band_filtered"] += 1; return
+        sender_grid = get("senderLocator") or get("senderGrid") or get("sl")
+        receiver_grid = get("receiverLocator") or get("receiverGrid") or get("rl")
         if not sender_grid or not receiver_grid:
-            DROP_COUNTS["missing_loc"] += 1; RECENT.append({"reason":"missing_loc","band":band}); return
-        sl = maidenhead_to_latlon(sender_grid); rl = maidenhead_to_latlon(receiver_grid)
+            _drops["missing_loc"] += 1; _recent.append((R_MISSING_LOC, _band_ids[band], None, 0, None)); return
+        sl = _grid(sender_grid.strip().upper()); rl = _grid(receiver_grid.strip().upper())
         if sl is None or rl is None:
-            DROP_COUNTS["grid_invalid"] += 1; RECENT.append({"reason":"grid_invalid","band":band}); return
-        now = time.time()
+            _drops["grid_invalid"] += 1; _recent.append((R_GRID_INVALID, _band_ids[band], None, 0, None)); return
+        snr = get("sNR");  snr = get("snr") if snr is None else snr;  snr = get("rp") if snr is None else snr
+        ts = get("flowStartSeconds") or get("t")
+        now = _time()
         if ts:
             try:
                 tval = float(ts);  now = (tval/1000.0) if tval > 2_000_000_000 else tval
             except Exception: pass
-        ds = haversine_km(HOME_LAT, HOME_LON, sl[0], sl[1])
-        dr = haversine_km(HOME_LAT, HOME_LON, rl[0], rl[1])
-        chosen = None; decision = None
-        if dr <= RADIUS_KM:
-            chosen=("sender", sl); decision="receiver_in_radius -> plot_sender"
-        elif ds <= RADIUS_KM:
-            chosen=("receiver", rl); decision="sender_in_radius -> plot_receiver"
-        if chosen is None:
-            DROP_COUNTS["radius"] += 1; RECENT.append({"reason":"radius","dS":round(ds,1),"dR":round(dr,1)}); return
-        kind, (plat, plon) = chosen
-        d = Dot(lat=plat, lon=plon, band=band, snr=parse_snr(snr), ts=now, kind=kind)
-        DOTS.append(d); PROCESSED += 1
-        RECENT.append({"reason":"ok","decision":decision,"band":band,"snr":parse_snr(snr)})
-        payload = {"lat": d.lat, "lon": d.lon, "band": d.band, "snr": d.snr, "ts": d.ts, "kind": d.kind}
-        if APP_LOOP is not None:
-            asyncio.run_coroutine_threadsafe(hub.broadcast("add", payload), APP_LOOP)
+        with _lock:
+            _ingest.append((sl[0], sl[1], rl[0], rl[1], band, snr, now))
+            full = len(_ingest) >= _max
+        if full: _wake.set()
     except Exception as e:
-        DROP_COUNTS["parse"] += 1; RECENT.append({"reason":"exception","error":str(e)[:200]})
+        _drops["parse"] += 1; _recent.append((R_EXCEPTION, None, None, 0, str(e)[:200]))
+
+def _bind_on_message():
+    on_message.__kwdefaults__["_bands"] = ENABLED_BANDS
+
+def _ingest_batch(batch):
+    global PROCESSED
+    # the radius test is chosen once per batch, not once per spot
+    if RADIUS_KM <= APPROX_MAX_KM: dist, limit = dist2_km, RADIUS_KM2
+    else: dist, limit = haversine_km, RADIUS_KM
+    _pack = REC.pack; _parse_snr = parse_snr; out = []
+    for slat, slon, rlat, rlon, band, snr, now in batch:
+        if dist(rlat, rlon) <= limit: lat, lon, kind, decision = slat, slon, 0, D_PLOT_SENDER
+        elif dist(slat, slon) <= limit: lat, lon, kind, decision = rlat, rlon, 1, D_PLOT_RECEIVER
+        else:
+            # true distances, fixed now so /recent reflects the home they were judged against
+            ds = round(haversine_km(slat, slon), 1); dr = round(haversine_km(rlat, rlon), 1)
+            DROP_COUNTS["radius"] += 1; RECENT.append((R_RADIUS, None, None, 0, (ds, dr))); continue
+        band_id = BAND_IDS[band]; snr_v = _parse_snr(snr)
+        out.append(_pack(lat, lon, band_id, SNR_NONE if snr_v is None else max(-32767, min(32767, snr_v)), now, kind))
+        RECENT.append((R_OK, band_id, snr_v, decision, None))
+    PROCESSED += len(out)
+    return b"".join(out)
+
+def _grid_cache_stats() -> dict:
+    gc = maidenhead_to_latlon.cache_info()
+    lookups = gc.hits + gc.misses
+    return {"hits": gc.hits, "misses": gc.misses, "size": gc.currsize,
+            "hit_rate": round(gc.hits/lookups, 3) if lookups else None}
+
+def _worker_config() -> dict:
+    return {"gen": CONFIG_GEN, "home_latlon": (HOME_LAT, HOME_LON), "radius_km": RADIUS_KM,
+            "bands": list(ENABLED_BANDS), "topics": list(TOPICS)}
+
+def _apply_worker_config(cfg: dict):
+    global CONFIG_GEN, HOME_LAT, HOME_LON, HOME_LAT_R, COS_HOME_LAT_R, RADIUS_KM, RADIUS_KM2, ENABLED_BANDS, TOPICS
+    HOME_LAT, HOME_LON = cfg["home_latlon"]; HOME_LAT_R = math.radians(HOME_LAT); COS_HOME_LAT_R = math.cos(HOME_LAT_R)
+    RADIUS_KM = cfg["radius_km"]; RADIUS_KM2 = RADIUS_KM**2
+    bands = frozenset(cfg["bands"])
+    if MQTT_CLIENT is None: TOPICS = cfg["topics"]
+    elif bands != ENABLED_BANDS: _update_mqtt_subscriptions(bands)
+    ENABLED_BANDS = bands; CONFIG_GEN = cfg["gen"]
+    _bind_on_message()
+    with INGEST_LOCK: INGEST.clear()
+
+def mqtt_worker(out_q, ctl, cfg: dict):
+    # child process: MQTT client, parsing and radius filter; ships packed records to the web process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _apply_worker_config(cfg)
+    client = mqtt_start()
+    try:
+        _worker_loop(out_q, ctl)
+    finally:
+        client.disconnect(); client.loop_stop()
 
-def mqtt_thread():
-    global MQTT_CLIENT, CURRENT_TOPICS, TOPICS
+def _worker_loop(out_q, ctl):
+    parent = multiprocessing.parent_process()
+    last_stats = 0.0
+    while True:
+        while ctl.poll():
+            cmd = ctl.recv()
+            if cmd is None: return
+            _apply_worker_config(cmd)
+        # drain INGEST every INGEST_FLUSH_S, or early once INGEST_MAX spots are queued
+        INGEST_WAKE.wait(INGEST_FLUSH_S); INGEST_WAKE.clear()
+        with INGEST_LOCK:
+            batch = INGEST[:]; INGEST.clear()
+        if batch:
+            try:
+                blob = _ingest_batch(batch)
+                if blob:
+                    try: out_q.put_nowait(("dots", CONFIG_GEN, blob))
+                    except queue.Full: DROP_COUNTS["queue_full"] += len(blob) // REC.size
+            except Exception as e:
+                DROP_COUNTS["parse"] += len(batch); RECENT.append((R_EXCEPTION, None, None, 0, str(e)[:200]))
+        now = time.monotonic()
+        if now - last_stats >= STATS_EVERY_S:
+            last_stats = now
+            if parent is not None and not parent.is_alive(): return  # web process is gone
+            try:
+                out_q.put_nowait(("stats", {"seen": SEEN, "processed": PROCESSED, "drops": dict(DROP_COUNTS),
+                                            "recent": list(RECENT), "grid_cache": _grid_cache_stats(),
+                                            "subscriptions": list(CURRENT_TOPICS)}))
+            except queue.Full: pass
+
+def _append_records(gen: int, blob: bytes) -> list:
+    if gen != CONFIG_GEN: return []
+    rows = list(REC.iter_unpack(blob))
+    DOTS.extend(*zip(*rows))
+    return [{"lat": la, "lon": lo, "band": _BAND_NM[b], "snr": None if s == SNR_NONE else s, "ts": t, "kind": KINDS[k]}
+            for la, lo, b, s, t, k in rows]
+
+def _apply_stats(st: dict):
+    global SEEN, PROCESSED, DROP_COUNTS, GRID_CACHE, CURRENT_TOPICS, STATS_VERSION, LAST_STATS
+    if st == LAST_STATS: return
+    LAST_STATS = st; STATS_VERSION += 1
+    SEEN = st["seen"]; PROCESSED = st["processed"]; DROP_COUNTS = st["drops"]
+    GRID_CACHE = st["grid_cache"]; CURRENT_TOPICS = set(st["subscriptions"])
+    RECENT.clear(); RECENT.extend(st["recent"])
+
+def _drain_worker() -> list:
+    # runs on the event loop: take everything the worker queued since the last flush
+    out = []
+    while True:
+        try: msg = WORKER_Q.get_nowait()
+        except queue.Empty: return out
+        if msg[0] == "dots": out.extend(_append_records(msg[1], msg[2]))
+        elif msg[0] == "stats": _apply_stats(msg[1])
+
+def mqtt_start():
+    # paho runs its network IO (and on_message) on its own background thread
+    global MQTT_CLIENT, CURRENT_TOPICS
     cfg = CONFIG.get("mqtt", {})
     random_client_id = f"pskprop-{uuid.uuid4()}"  # Generate a random client_id
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=random_client_id)
     MQTT_CLIENT = client
     client.on_connect = on_connect
     client.on_message = on_message
-    client.connect(cfg.get("host","mqtt.pskreporter.info"), cfg.get("port",1883), cfg.get("keepalive",60))
+    client.connect_async(cfg.get("host","mqtt.pskreporter.info"), cfg.get("port",1883), cfg.get("keepalive",60))
     CURRENT_TOPICS = set(TOPICS)
-    client.loop_forever(retry_first_connection=True)
-
-def prune_thread():
+    client.loop_start()
+    return client
+
+def _start_worker():
+    # spawn, not fork: a restart happens after the threadpool is up, and a fork would also inherit uvicorn's socket
+    global WORKER_PROC, WORKER_Q, WORKER_CTL
+    ctx = multiprocessing.get_context("spawn")
+    WORKER_Q = ctx.Queue(WORKER_QUEUE_MAX)
+    WORKER_CTL, worker_ctl = ctx.Pipe()
+    WORKER_PROC = ctx.Process(target=mqtt_worker, args=(WORKER_Q, worker_ctl, _worker_config()), daemon=True)
+    WORKER_PROC.start()
+
+def _check_worker():
+    global WORKER_RESTARTS
+    if WORKER_PROC is None or WORKER_PROC.is_alive(): return
+    print(f"MQTT worker exited (exitcode={WORKER_PROC.exitcode}); restarting")
+    WORKER_RESTARTS += 1
+    _start_worker()
+
+async def _prune_loop():
+    last_checkpoint = time.monotonic()
     while True:
+        await asyncio.sleep(10)
+        try: _check_worker()
+        except Exception as e:
+            print(f"worker restart: {e}")
+        if DOTS.prune(time.time() - AGE_MIN*60) > 0:
+            await hub.broadcast("count", {"count": len(DOTS)})
+        if time.monotonic() - last_checkpoint >= CHECKPOINT_S:
+            last_checkpoint = time.monotonic(); save_state()
+
+STATE_HEADER = struct.Struct("<3d")  # home lat, home lon, radius_km the dots were filtered with
+
+def save_state():
+    # header plus packed REC records, so a restart with other filter settings ignores them
+    try:
+        tmp = STATE_PATH + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(STATE_HEADER.pack(HOME_LAT, HOME_LON, RADIUS_KM))
+            f.write(b"".join(REC.pack(*r) for r in zip(*DOTS.arrays())))
+        os.replace(tmp, STATE_PATH)
+    except Exception as e:
+        print(f"save_state: {e}")
+
+def load_state():
+    try:
+        if not os.path.exists(STATE_PATH) or time.time() - os.path.getmtime(STATE_PATH) > AGE_MIN*60: return
+        with open(STATE_PATH, "rb") as f: data = f.read()
+        saved = STATE_HEADER.unpack_from(data)
+        if not all(math.isclose(a, b) for a, b in zip(saved, (HOME_LAT, HOME_LON, RADIUS_KM))): return
+        body = data[STATE_HEADER.size:]; body = body[:len(body) - len(body) % REC.size]
         cutoff = time.time() - AGE_MIN*60
-        changed = False
-        while DOTS and DOTS[0].ts < cutoff:
-            DOTS.popleft(); changed = True
-        if changed and APP_LOOP is not None:
-            asyncio.run_coroutine_threadsafe(hub.broadcast("count", {"count": len(DOTS)}), APP_LOOP)
-        time.sleep(10)
+        bands = {BAND_IDS[b] for b in ENABLED_BANDS if b in BAND_IDS}
+        rows = [r for r in REC.iter_unpack(body) if r[4] >= cutoff and r[2] in bands]
+        if rows: DOTS.extend(*zip(*rows))
+        print(f"restored {len(rows)} dots from {STATE_PATH}")
+    except Exception as e:
+        print(f"load_state: {e}")
 
 def _update_mqtt_subscriptions(new_bands):
     global TOPICS, CURRENT_TOPICS, MQTT_CLIENT
@@ -217,33 +495,59 @@ def _update_mqtt_subscriptions(new_bands):
         except Exception: pass
     CURRENT_TOPICS = new_topics; TOPICS = list(new_topics)
 
+CLIENT_QUEUE_MAX = 256
+
 class Hub:
-    def __init__(self): self.clients: List[asyncio.Queue] = []
+    def __init__(self):
+        self.clients: Set[asyncio.Queue] = set(); self.dropped = 0
     async def connect(self) -> asyncio.Queue:
-        q = asyncio.Queue(); self.clients.append(q); return q
+        q = asyncio.Queue(maxsize=CLIENT_QUEUE_MAX); self.clients.add(q); return q
     async def disconnect(self, q: asyncio.Queue):
-        if q in self.clients: self.clients.remove(q)
+        self.clients.discard(q)
     async def broadcast(self, event_type: str, payload: dict):
-        msg = {"type": event_type, "payload": payload}
-        for q in list(self.clients):
-            try: await q.put(json.dumps(msg))
-            except RuntimeError: pass
+        # put_nowait never blocks, so one slow client cannot hold up the others
+        clients = tuple(self.clients)
+        if not clients: return
+        data = orjson.dumps({"type": event_type, "payload": payload}).decode()
+        for q in clients:
+            try: q.put_nowait(data)
+            except asyncio.QueueFull:
+                # slow client: discard its oldest frame instead of growing without bound
+                q.get_nowait(); q.put_nowait(data); self.dropped += 1
 
 hub = Hub()
 
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(FLUSH_S)
+        try: batch = _drain_worker()
+        except Exception as e:
+            print(f"flush: {e}"); continue
+        if batch:
+            await hub.broadcast("add_batch", {"dots": batch})
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global APP_LOOP
+    global APP_LOOP, WORKER_PROC, WORKER_Q, WORKER_CTL
     APP_LOOP = asyncio.get_running_loop()
-    t1 = threading.Thread(target=mqtt_thread, daemon=True); t1.start()
-    t2 = threading.Thread(target=prune_thread, daemon=True); t2.start()
+    load_state()
+    _start_worker()
+    flush_task = asyncio.create_task(_flush_loop())
+    prune_task = asyncio.create_task(_prune_loop())
     try:
         yield
     finally:
+        flush_task.cancel(); prune_task.cancel()
         try:
-            if MQTT_CLIENT is not None: MQTT_CLIENT.disconnect()
+            WORKER_CTL.send(None)
+            WORKER_PROC.join(3)
+            if WORKER_PROC.is_alive(): WORKER_PROC.terminate()
+            WORKER_Q.close(); WORKER_Q.join_thread()
         except Exception:
             pass
+        # release the spawn-context queue now; uvicorn re-raises SIGTERM after shutdown, skipping atexit cleanup
+        WORKER_PROC = WORKER_Q = WORKER_CTL = None
+        save_state()
 
 app = FastAPI(title="PSK Prop Radius Map", lifespan=lifespan)
 
@@ -265,9 +569,24 @@ def legacy_favicon():
         return FileResponse(fav, media_type="image/svg+xml")
     return FileResponse(os.path.join(STATIC_DIR, "index.html"))
 
+_RESPONSE_CACHE: dict = {}
+_BOOT = uuid.uuid4().hex[:8]  # keeps ETags from matching across restarts
+
+def _etag_json(req: Request, key: str, etag: str, build) -> Response:
+    # serve 304 on a matching If-None-Match, else the bytes cached for this etag
+    if req.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    hit = _RESPONSE_CACHE.get(key)
+    if hit is None or hit[0] != etag:
+        hit = (etag, orjson.dumps(build())); _RESPONSE_CACHE[key] = hit
+    return Response(hit[1], media_type="application/json", headers={"ETag": etag})
+
 @app.get("/config")
-def get_config():
-    public = {
+def get_config(req: Request):
+    return _etag_json(req, "config", f'"{_BOOT}c{CONFIG_GEN}"', _public_config)
+
+def _public_config() -> dict:
+    return {
         "home_locator": CONFIG.get("home_locator"),
         "home_latlon": [HOME_LAT, HOME_LON],
         "radius_km": RADIUS_KM,
@@ -276,38 +595,41 @@ def get_config():
         "band_colors": BAND_COLORS,
         "map_type": MAP_TYPE,
     }
-    return JSONResponse(public)
 
 @app.post("/config")
 async def update_config(req: Request):
     body = await req.json()
-    global CONFIG, HOME_LAT, HOME_LON, RADIUS_KM, AGE_MIN, ENABLED_BANDS, MAP_TYPE
+    global CONFIG, CONFIG_GEN, HOME_LAT, HOME_LON, HOME_LAT_R, COS_HOME_LAT_R, RADIUS_KM, RADIUS_KM2, AGE_MIN, ENABLED_BANDS, MAP_TYPE, TOPICS
     changed = False; bands_changed = False
     if "home_locator" in body:
         latlon = maidenhead_to_latlon(body["home_locator"])
         if latlon:
             CONFIG["home_locator"] = body["home_locator"]; HOME_LAT, HOME_LON = latlon; changed = True
+            HOME_LAT_R = math.radians(HOME_LAT); COS_HOME_LAT_R = math.cos(HOME_LAT_R)
     if "radius_km" in body:
-        RADIUS_KM = float(body["radius_km"]); CONFIG["radius_km"] = RADIUS_KM; changed = True
+        RADIUS_KM = float(body["radius_km"]); RADIUS_KM2 = RADIUS_KM**2; CONFIG["radius_km"] = RADIUS_KM; changed = True
     if "age_minutes" in body:
         AGE_MIN = int(body["age_minutes"]); CONFIG["age_minutes"] = AGE_MIN; changed = True
     if "bands" in body and isinstance(body["bands"], list):
-        ENABLED_BANDS = set(body["bands"]); CONFIG["bands"] = list(ENABLED_BANDS); changed = True; bands_changed = True
+        ENABLED_BANDS = frozenset(body["bands"]); CONFIG["bands"] = list(ENABLED_BANDS); changed = True; bands_changed = True
+        TOPICS = [f"pskr/filter/v2/{b}/#" for b in ENABLED_BANDS]
     if "map_type" in body:
         MAP_TYPE = body["map_type"]; CONFIG["map_type"] = MAP_TYPE; changed = True
     if changed:
+        CONFIG_GEN += 1
         DOTS.clear()
-        if bands_changed: _update_mqtt_subscriptions(ENABLED_BANDS)
+        if WORKER_CTL is not None:
+            try: WORKER_CTL.send(_worker_config())
+            except OSError: pass  # worker died; _check_worker restarts it with the current config
         if APP_LOOP is not None:
-            try: asyncio.run_coroutine_threadsafe(hub.broadcast("snapshot", {"dots": []}), APP_LOOP)
+            try: asyncio.run_coroutine_threadsafe(hub.broadcast("snapshot", DOTS.columns()), APP_LOOP)
             except Exception: pass
     return JSONResponse({"ok": True, "cleared": changed, "bands_changed": bands_changed})
 
 @app.get("/events")
 async def events(request: Request):
     q = await hub.connect()
-    snap = [asdict(d) for d in list(DOTS)]
-    await q.put(json.dumps({"type": "snapshot", "payload": {"dots": snap}}))
+    await q.put(snapshot_frame())
     async def event_generator():
         try:
             while True:
@@ -322,16 +644,39 @@ async def events(request: Request):
     return EventSourceResponse(event_generator())
 
 @app.get("/stats")
-def stats():
-    return JSONResponse({
+def stats(req: Request):
+    # worker_alive is in the body, so a dead worker must change the tag before _check_worker notices it
+    alive = WORKER_PROC is not None and WORKER_PROC.is_alive()
+    etag = f'"{_BOOT}s{STATS_VERSION}.{CONFIG_GEN}.{DOTS.version}.{len(hub.clients)}.{hub.dropped}.{WORKER_RESTARTS}.{int(alive)}"'
+    return _etag_json(req, "stats", etag, _stats)
+
+def _stats() -> dict:
+    return {
         "dots": len(DOTS),
         "processed": PROCESSED,
         "seen": SEEN,
         "enabled_bands": list(ENABLED_BANDS),
         "drops": DROP_COUNTS,
         "subscriptions": list(CURRENT_TOPICS),
-    })
+        "sse_clients": len(hub.clients),
+        "sse_dropped": hub.dropped,
+        "worker_alive": WORKER_PROC is not None and WORKER_PROC.is_alive(),
+        "worker_restarts": WORKER_RESTARTS,
+        "grid_cache": GRID_CACHE,
+    }
+
+def _recent_dict(rec) -> dict:
+    reason, band_id, snr, decision, extra = rec
+    if reason == R_RADIUS:
+        return {"reason": "radius", "dS": extra[0], "dR": extra[1]}
+    if reason == R_EXCEPTION:
+        return {"reason": "exception", "error": extra}
+    d = {"reason": REASONS[reason]}
+    if decision: d["decision"] = DECISIONS[decision]
+    d["band"] = _BAND_NM[band_id]
+    if reason == R_OK: d["snr"] = snr
+    return d
 
 @app.get("/recent")
-def recent():
-    return JSONResponse({"recent": list(RECENT)})
+def recent(req: Request):
+    return _etag_json(req, "recent", f'"{_BOOT}r{STATS_VERSION}.{CONFIG_GEN}"', lambda: {"recent": [_recent_dict(r) for r in list(RECENT)]})